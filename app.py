@@ -1,121 +1,305 @@
 
 from flask import Flask, render_template, request, Response, abort
 import requests, urllib.parse, json
-from datetime import date, timedelta
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter, Retry
+from datetime import date, datetime, timedelta
+
+from projection import project_issue
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None
 
 app = Flask(__name__)
 
-# --- Utilitaires ---
-def format_seconds_human(seconds: int | None) -> str | None:
-    if seconds is None:
-        return None
-    s = int(seconds)
-    days, rem = divmod(s, 86400)
-    hours, rem = divmod(rem, 3600)
-    minutes, _ = divmod(rem, 60)
-    parts = []
-    if days:    parts.append(f"{days} day" + ("s" if days>1 else ""))
-    if hours:   parts.append(f"{hours} hour" + ("s" if hours>1 else ""))
-    if minutes: parts.append(f"{minutes} minute" + ("s" if minutes>1 else ""))
-    return ", ".join(parts) if parts else "0 minutes"
+# Le JSON exporte est tres compressible (cles repetees, timestamps ISO) :
+# gzip reduit les octets sur le fil d un facteur ~8-10, y compris sur la
+# reponse streamee (compression par chunks).
+if Compress is not None:
+    app.config["COMPRESS_MIMETYPES"] = ["application/json"]
+    app.config["COMPRESS_LEVEL"] = 6
+    # Le defaut streaming de flask-compress >= 1.12 omet gzip : un client qui
+    # n annonce que 'Accept-Encoding: gzip' recevrait l export streame en clair.
+    app.config["COMPRESS_ALGORITHM_STREAMING"] = ["zstd", "br", "gzip", "deflate"]
+    Compress(app)
+
+# --- Session HTTP partagee ---
+# Keep-alive + pool de connexions : une seule poignee de main TLS reutilisee
+# par toutes les requetes Jira, avec retries sur les erreurs transitoires.
+# Avec requests-cache, les reponses GET sont persistees sur disque (SQLite) ;
+# cache_control=True renvoie des requetes conditionnelles (ETag/Last-Modified),
+# donc une entree perimee se revalide par un 304 sans re-transfert du corps.
+# Les fenetres N-1 etant figees apres cloture du mois, les exports suivants
+# du meme mois ne coutent quasiment plus d E/S Jira.
+def _cache_key(request, **kwargs):
+    """Cle de cache par defaut + empreinte des identifiants de l appelant.
+
+    Les identifiants viennent du formulaire a chaque requete, et
+    requests-cache retire Authorization de la cle par defaut via
+    ignored_parameters -- AVANT d appliquer match_headers --, donc tous les
+    utilisateurs partageraient les memes entrees disque (un appelant avec
+    d autres identifiants, voire invalides, serait servi depuis le cache
+    d un autre utilisateur sans jamais toucher Jira). On mele donc un
+    SHA-256 de l en-tete Authorization a la cle : chaque jeu d identifiants
+    a ses propres entrees, sans stocker le secret en clair dans SQLite."""
+    base = requests_cache.cache_keys.create_key(request, **kwargs)
+    cred = hashlib.sha256((request.headers.get("Authorization") or "").encode()).hexdigest()
+    return f"{base}.{cred}"
+
+if requests_cache is not None:
+    SESSION = requests_cache.CachedSession(
+        "jira_cache.sqlite",
+        expire_after=timedelta(days=30),
+        allowable_methods=("GET",),
+        cache_control=True,
+        key_fn=_cache_key,
+    )
+else:
+    SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504]),
+)
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+
+# Cache memoire court devant la session : les re-exports rapproches (retry,
+# double-clic, iteration) retapent exactement les memes URLs. Operations dict
+# explicites plutot que lru_cache : il faut un TTL et une borne d eviction.
+_HTTP_CACHE = TTLCache(maxsize=4096, ttl=120) if TTLCache is not None else None
+_HTTP_CACHE_LOCK = threading.Lock()
+
+def _cached_get(url, **kwargs):
+    "GET via SESSION, memoise 120 s par (URL, identifiants) ; bypass en mode stream."
+    if _HTTP_CACHE is None or kwargs.get("stream"):
+        return SESSION.get(url, **kwargs)
+    # Les identifiants font partie de la cle : sans eux, un appelant avec
+    # d autres identifiants relirait la reponse d un autre utilisateur.
+    key = (url, kwargs.get("auth"))
+    with _HTTP_CACHE_LOCK:
+        resp = _HTTP_CACHE.get(key)
+    if resp is not None:
+        return resp
+    resp = SESSION.get(url, **kwargs)
+    if resp.ok:
+        with _HTTP_CACHE_LOCK:
+            _HTTP_CACHE[key] = resp
+    return resp
+
+def _next_month_start():
+    "1er du mois prochain : date de peremption des JQL relatifs (startOfMonth)."
+    today = date.today()
+    if today.month == 12:
+        return datetime(today.year + 1, 1, 1)
+    return datetime(today.year, today.month + 1, 1)
+
+# --- Serialisation ---
+if orjson is not None:
+    def _dumps(obj):
+        "Serialise en bytes via orjson (Rust, ~3-6x plus rapide que json)."
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+else:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+if orjson is not None:
+    def _dumps_item(obj):
+        "Serialisation compacte d un element (pour le streaming)."
+        return orjson.dumps(obj)
+else:
+    def _dumps_item(obj):
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+def _loads(resp):
+    "Parse une reponse requests ; resp.content (bytes) evite un decode UTF-8 inutile."
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return json.loads(resp.content)
+
+# En dessous de ce seuil, materialiser la page entiere avec orjson reste
+# plus rapide que le parsing evenementiel (surcout ijson sur petits corps).
+_STREAM_THRESHOLD = 1 << 20  # 1 Mo
+
+def _parse_search_page(resp):
+    """Parse une page /search : ijson en streaming au-dela de 1 Mo
+    (les tickets sont construits un a un, jamais tout le graphe d objets
+    de la reponse), orjson sinon."""
+    if ijson is None or int(resp.headers.get("Content-Length") or 0) <= _STREAM_THRESHOLD:
+        return _loads(resp)
+
+    # Rejeu depuis requests-cache : le corps est deja en memoire et le raw
+    # reconstitue ne supporte pas le sniff ijson (read(0) est pris pour un
+    # EOF et ferme le flux -> IncompleteJSONError). On parse le contenu
+    # directement, il n y a de toute facon rien a streamer depuis le socket.
+    if getattr(resp, "from_cache", False):
+        return _loads(resp)
+
+    resp.raw.decode_content = True  # gzip transparent, comme resp.content
+    data = {"issues": []}
+    issues = data["issues"]
+    builder = None
+    for prefix, event, value in ijson.parse(resp.raw):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == "issues.item" and event == "end_map":
+                issues.append(builder.value)
+                builder = None
+        elif prefix == "issues.item" and event == "start_map":
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        elif prefix == "total":
+            data["total"] = value
+    return data
 
 def fetch_all_issues(base_url, auth, jql, fields, max_results=100):
     search_url = base_url.rstrip('/') + "/rest/api/2/search"
     headers = {"Accept": "application/json"}
-    issues, start_at, total = [], 0, None
 
-    while True:
-        params = {
-            "jql": jql,
-            "fields": fields,
-            "maxResults": str(max_results),
-            "startAt": str(start_at),
-        }
-        url = search_url + "?" + urllib.parse.urlencode(params)
-        resp = requests.get(url, headers=headers, auth=auth, timeout=30)
+    # La partie fixe (jql, fields, maxResults) est encodee une seule fois ;
+    # seul startAt change d une page a l autre. URL stable = meilleure cle
+    # pour le cache HTTP et la compression d en-tetes.
+    prefix = search_url + "?" + urllib.parse.urlencode({
+        "jql": jql,
+        "fields": fields,
+        "maxResults": str(max_results),
+    })
+
+    def get_page(start_at):
+        url = f"{prefix}&startAt={start_at}"
+        # stream=True -> _cached_get laisse passer (corps consomme via raw) ;
+        # ces pages restent couvertes par le cache disque requests-cache.
+        # L URL embarque un JQL relatif (startOfMonth) qui change de sens au
+        # 1er du mois : l entree expire a cette date, pas 30 jours plus tard.
+        cache_kwargs = {"expire_after": _next_month_start()} if requests_cache is not None else {}
+        resp = _cached_get(url, headers=headers, auth=auth, timeout=30, stream=True,
+                           **cache_kwargs)
         if resp.status_code >= 400:
             abort(resp.status_code, resp.text)
+        return _parse_search_page(resp)
+
+    # Page 0 en synchrone pour connaitre le total...
+    data = get_page(0)
+    issues = data.get("issues", [])
+    total = data.get("total", len(issues))
+    page_size = len(issues) or max_results
+    if total <= len(issues):
+        return issues
+
+    # ... puis les offsets restants sont independants : fetch en parallele.
+    # executor.map preserve l ordre des pages (le JQL contient un ORDER BY).
+    offsets = range(page_size, total, page_size)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for page in executor.map(get_page, offsets):
+            issues.extend(page.get("issues", []))
+    return issues
+
+def _paginate(url, items_key, auth, params=None, start_at=0, max_results=100, label=""):
+    """Generateur commun de pagination Jira (startAt/maxResults).
 
-        data = resp.json()
-        batch = data.get("issues", [])
-        issues.extend(batch)
+    Yield les elements un a un : le consommateur peut streamer sans jamais
+    materialiser la liste complete (memoire = une page), ou simplement
+    faire list(_paginate(...))."""
+    headers = {"Accept": "application/json"}
+    sa, total = start_at, None
+    while True:
+        page_params = dict(params or {}, startAt=str(sa), maxResults=str(max_results))
+        page_url = url + "?" + urllib.parse.urlencode(page_params)
+        resp = _cached_get(page_url, headers=headers, auth=auth, timeout=30)
+        if resp.status_code >= 400:
+            abort(resp.status_code, f"{label}error: {resp.text}")
+        data = _loads(resp)
+        batch = data.get(items_key, [])
+        yield from batch
         if total is None:
             total = data.get("total", len(batch))
-        start_at += len(batch)
-        if start_at >= total:
+        sa += len(batch)
+        if sa >= total or not batch:
             break
-    return issues
 
 def fetch_worklogs(base_url, auth, issue_key, start_at=0, max_results=100):
     "Charge tous les worklogs d un ticket (pagination)."
-    headers = {"Accept": "application/json"}
     url = base_url.rstrip('/') + f"/rest/api/2/issue/{issue_key}/worklog"
-    logs_all, sa = [], start_at
-    while True:
-        params = {"startAt": str(sa), "maxResults": str(max_results)}
-        resp = requests.get(url, headers=headers, auth=auth, params=params, timeout=30)
-        if resp.status_code >= 400:
-            abort(resp.status_code, f"[{issue_key}] worklog error: {resp.text}")
-        data = resp.json()
-        logs = data.get("worklogs", [])
-        total = data.get("total", 0)
-        logs_all.extend(logs)
-        sa += len(logs)
-        if sa >= total:
-            break
-    return logs_all
+    return list(_paginate(url, "worklogs", auth, start_at=start_at,
+                          max_results=max_results, label=f"[{issue_key}] worklog "))
+
+def _project_one(it, base_url, auth, include_worklogs):
+    "Projette un ticket ; fetch worklog de repli si la liste en ligne est tronquee."
+    if not include_worklogs:
+        return project_issue(it)
+    f = it.get("fields", {})
+    wl = f.get("worklog") or {}
+    logs = wl.get("worklogs") or []
+    # Repli uniquement si du temps a ete impute ET que /search a tronque
+    # la liste en ligne (total > ~20 worklogs renvoyes) -- le cas rare.
+    if (f.get("timespent") or f.get("aggregatetimespent")) and wl.get("total", 0) > len(logs):
+        try:
+            logs = fetch_worklogs(base_url, auth, it.get("key"))
+        except Exception:
+            # En plein stream, le statut 200 et les en-tetes sont deja partis :
+            # laisser remonter abort() tronquerait le JSON en pleine reponse.
+            # On degrade sur les worklogs en ligne (potentiellement incomplets).
+            app.logger.exception("worklog fallback failed for %s", it.get("key"))
+    return project_issue(it, logs)
 
 def project_issues(issues, base_url, auth, include_worklogs=True):
-    out = []
-    for it in issues:
-        f = it.get("fields", {})
-        original = f.get("timeoriginalestimate")     # seconds
-        remaining = f.get("timeestimate")            # seconds
-        spent = f.get("timespent")                   # seconds
-        agg_orig = f.get("aggregatetimeoriginalestimate")
-        agg_rem  = f.get("aggregatetimeestimate")
-        agg_sp   = f.get("aggregatetimespent")
-
-        item = {
-            "key": it.get("key"),
-            "summary": f.get("summary"),
-            "status": (f.get("status") or {}).get("name"),
-            "resolution": (f.get("resolution") or {}).get("name"),
-            "resolutiondate": f.get("resolutiondate"),
-            "updated": f.get("updated"),
-            "assignee": (f.get("assignee") or {}).get("displayName"),
-            "labels": f.get("labels"),
-            "components": [c.get("name") for c in (f.get("components") or [])],
-            "time": {
-                "originalEstimateSeconds": original,
-                "originalEstimateHuman":   format_seconds_human(original),
-                "remainingEstimateSeconds": remaining,
-                "remainingEstimateHuman":   format_seconds_human(remaining),
-                "timeSpentSeconds": spent,
-                "timeSpentHuman":           format_seconds_human(spent),
-                "aggregateOriginalEstimateSeconds": agg_orig,
-                "aggregateOriginalEstimateHuman":   format_seconds_human(agg_orig),
-                "aggregateRemainingEstimateSeconds": agg_rem,
-                "aggregateRemainingEstimateHuman":   format_seconds_human(agg_rem),
-                "aggregateTimeSpentSeconds": agg_sp,
-                "aggregateTimeSpentHuman":   format_seconds_human(agg_sp),
-            }
-        }
-
-        if include_worklogs:
-            logs_all = fetch_worklogs(base_url, auth, it.get("key"))
-            # Worklog : timeSpentSeconds + timeSpent (humain c�t� API Server/DC)
-            # Si timeSpent (string) absent, on reformate � partir des secondes.
-            item["worklogs"] = [{
-                "author": (wl.get("author") or {}).get("displayName"),
-                "started": wl.get("started"),  # ISO datetime
-                "timeSpentSeconds": wl.get("timeSpentSeconds"),
-                "timeSpentHuman": wl.get("timeSpent") or format_seconds_human(wl.get("timeSpentSeconds")),
-                "comment": wl.get("comment") if isinstance(wl.get("comment"), str) else None
-            } for wl in logs_all]
-
-        out.append(item)
-    return out
+    "Generateur : projette les tickets un par un (memoire O(1 ticket))."
+    # Chaque ticket est independant et le GIL est relache pendant les GET :
+    # le pool de threads recouvre les fetchs worklog de repli, en reutilisant
+    # la SESSION partagee (pool de connexions, cache disque, retries).
+    # ex.map preserve l ordre des tickets.
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        yield from ex.map(lambda it: _project_one(it, base_url, auth, include_worklogs), issues)
+
+# --- Constantes /export ---
+# La liste de champs et les gabarits JQL ne dependent que du projet :
+# construits une fois au chargement, le handler ne fait plus que parser
+# la requete et lancer les E/S.
+FIELDS = ",".join([
+    "key","summary","status","resolution","resolutiondate","updated",
+    "assignee","labels","components",
+    # time tracking (issue + aggregates)
+    "timeoriginalestimate","timeestimate","timespent",
+    "aggregatetimeoriginalestimate","aggregatetimeestimate","aggregatetimespent",
+    # worklogs inclus dans /search (les ~20 premiers par ticket)
+    "worklog"
+])
+
+# JQL (updated // ou // tickets clos via resolutiondate)
+_JQL_UPDATED = (
+    "project = {p} AND statusCategory != Done "
+    "AND updated >= startOfMonth(-1) AND updated < startOfMonth() "
+    "ORDER BY updated ASC"
+)
+_JQL_RESOLVED = (
+    "project = {p} AND resolution IS NOT EMPTY "
+    "AND resolutiondate >= startOfMonth(-1) AND resolutiondate < startOfMonth() "
+    "ORDER BY resolutiondate ASC"
+)
 
 @app.get("/")
 def form():
@@ -128,42 +312,38 @@ def export():
     username   = request.form.get("username", "").strip()
     password   = request.form.get("password", "")
     use_updated = request.form.get("useUpdated") == "on"
+    pretty      = request.form.get("pretty") == "on"
 
     if not all([base_url, project, username, password]):
         abort(400, "Parametres manquants")
 
-    # JQL (updated // ou // tickets clos via resolutiondate)
-    if use_updated:
-        jql = (
-            f"project = {project} AND statusCategory != Done "
-            f"AND updated >= startOfMonth(-1) AND updated < startOfMonth() "
-            f"ORDER BY updated ASC"
-        )
-    else:
-        jql = (
-            f"project = {project} AND resolution IS NOT EMPTY "
-            f"AND resolutiondate >= startOfMonth(-1) AND resolutiondate < startOfMonth() "
-            f"ORDER BY resolutiondate ASC"
-        )
-
-    fields = ",".join([
-        "key","summary","status","resolution","resolutiondate","updated",
-        "assignee","labels","components",
-        # time tracking (issue + aggregates)
-        "timeoriginalestimate","timeestimate","timespent",
-        "aggregatetimeoriginalestimate","aggregatetimeestimate","aggregatetimespent"
-    ])
-
-    issues = fetch_all_issues(base_url, (username, password), jql, fields)
+    jql = (_JQL_UPDATED if use_updated else _JQL_RESOLVED).format(p=project)
+
+    issues = fetch_all_issues(base_url, (username, password), jql, FIELDS)
     projected = project_issues(issues, base_url, (username, password), include_worklogs=True)
 
-    payload = json.dumps(projected, ensure_ascii=False, indent=2)
     filename = f"jira_{project}_prev_month{'_updated' if use_updated else ''}.json"
-    return Response(
-        payload,
-        mimetype="application/json",
-        headers={"Content-Disposition": f'attachment; filename=\"{filename}\"'}
-    )
+    headers = {"Content-Disposition": f'attachment; filename=\"{filename}\"'}
+
+    # Le fichier part en piece jointe : l indentation ne sert qu aux humains
+    # (elle double la taille et ralentit la serialisation), donc compact par
+    # defaut et pretty=on pour le chemin bufferise indente.
+    if pretty:
+        return Response(_dumps(list(projected)), mimetype="application/json", headers=headers)
+
+    # Reponse streamee : un ticket serialise a la fois au lieu de bufferiser
+    # tout le JSON -> memoire plate et premier octet envoye immediatement.
+    def generate():
+        yield b"["
+        first = True
+        for item in projected:
+            if not first:
+                yield b","
+            yield _dumps_item(item)
+            first = False
+        yield b"]"
+
+    return Response(generate(), mimetype="application/json", headers=headers)
 
 @app.get("/ping")
 def ping():
@@ -0,0 +1,95 @@
+"""
+projection.py — Projection pure des tickets Jira (aucune E/S).
+
+Volontairement typé et sans dépendance Flask/requests : le module peut être
+compilé en extension C avec mypyc (`mypyc projection.py`) pour supprimer le
+dispatch de l'interpréteur dans la boucle chaude. app.py importe simplement
+`project_issue` ; si un `projection*.so` compilé est présent il est ramassé,
+sinon la version interprétée fait foi. Aucun changement d'API.
+"""
+
+from functools import lru_cache
+from typing import Any
+
+
+def _compute_human(s: int) -> str:
+    days, rem = divmod(s, 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes, _ = divmod(rem, 60)
+    parts = []
+    if days:    parts.append(f"{days} day" + ("s" if days>1 else ""))
+    if hours:   parts.append(f"{hours} hour" + ("s" if hours>1 else ""))
+    if minutes: parts.append(f"{minutes} minute" + ("s" if minutes>1 else ""))
+    return ", ".join(parts) if parts else "0 minutes"
+
+
+# Les saisies Jira se font quasi toujours par pas de 15 min bornes par
+# quelques jours : table precalculee 0..30 jours (~2900 chaines), un seul
+# lookup dict au lieu de 3 divmod + join. Les valeurs atypiques passent
+# par le chemin memoise.
+_COMMON: dict[int, str] = {s: _compute_human(s) for s in range(0, 30 * 86400 + 1, 900)}
+
+_slow = lru_cache(maxsize=4096)(_compute_human)
+
+
+def format_seconds_human(seconds: int | None) -> str | None:
+    if seconds is None:
+        return None
+    s = int(seconds)
+    hit = _COMMON.get(s)
+    return hit if hit is not None else _slow(s)
+
+
+# (cle champ Jira, prefixe de cle de sortie) pour le sous-dict "time"
+# Tuple vide partage (singleton CPython) : aucune allocation pour les tickets
+# sans composant.
+_EMPTY: tuple = ()
+
+_TIME_KEYS: tuple[tuple[str, str], ...] = (
+    ("timeoriginalestimate",          "originalEstimate"),
+    ("timeestimate",                  "remainingEstimate"),
+    ("timespent",                     "timeSpent"),
+    ("aggregatetimeoriginalestimate", "aggregateOriginalEstimate"),
+    ("aggregatetimeestimate",         "aggregateRemainingEstimate"),
+    ("aggregatetimespent",            "aggregateTimeSpent"),
+)
+
+
+def project_issue(it: dict[str, Any], worklogs: list[dict[str, Any]] | None = None) -> dict[str, Any]:
+    "Projette un ticket Jira (+ worklogs optionnels) vers le schema d export."
+    f: dict[str, Any] = it.get("fields", {})
+    status = f.get("status")
+    resolution = f.get("resolution")
+    assignee = f.get("assignee")
+
+    time_block: dict[str, Any] = {}
+    for fk, hk in _TIME_KEYS:
+        v = f.get(fk)           # seconds
+        time_block[hk + "Seconds"] = v
+        time_block[hk + "Human"] = format_seconds_human(v)
+
+    item: dict[str, Any] = {
+        "key": it.get("key"),
+        "summary": f.get("summary"),
+        "status": status.get("name") if status else None,
+        "resolution": resolution.get("name") if resolution else None,
+        "resolutiondate": f.get("resolutiondate"),
+        "updated": f.get("updated"),
+        "assignee": assignee.get("displayName") if assignee else None,
+        "labels": f.get("labels"),
+        "components": tuple(c.get("name") for c in f.get("components") or _EMPTY),
+        "time": time_block,
+    }
+
+    if worklogs is not None:
+        # Worklog : timeSpentSeconds + timeSpent (humain cote API Server/DC)
+        # Si timeSpent (string) absent, on reformate a partir des secondes.
+        item["worklogs"] = [{
+            "author": (wl.get("author") or {}).get("displayName"),
+            "started": wl.get("started"),  # ISO datetime
+            "timeSpentSeconds": wl.get("timeSpentSeconds"),
+            "timeSpentHuman": wl.get("timeSpent") or format_seconds_human(wl.get("timeSpentSeconds")),
+            "comment": wl.get("comment") if isinstance(wl.get("comment"), str) else None
+        } for wl in worklogs]
+
+    return item